@@ -0,0 +1,127 @@
+import base64
+import logging
+import numpy as np
+import os
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import List, Optional, Sequence
+from openai import AsyncOpenAI
+from embedding_config import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, normalize_query
+from semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+# Optionally serve queries from an in-memory FAISS index built from the collection:
+# "faiss" for exact float32 search, "faiss-sq8" for an int8-quantized HNSW index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+# The ChromaDB collection and optional FAISS index, loaded by init() in the process
+# that serves queries
+collection = None
+faiss_index = None
+
+# Initialize OpenAI client
+client = AsyncOpenAI()
+
+# Embeddings of recent normalized queries, least recently used first
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+_query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+# Near-duplicate queries are answered from this cache instead of Chroma
+query_cache = SemanticCache(capacity=1000, threshold=0.97, ttl_seconds=3600)
+
+class MessageResponse(BaseModel):
+    message: str
+    similarity: float
+    metadata: Optional[dict] = None
+
+async def _embed_query(normalized_query: str) -> np.ndarray:
+    """Get the embedding for a normalized query, cached for repeat queries"""
+    embedding = _query_embeddings.get(normalized_query)
+    if embedding is not None:
+        _query_embeddings.move_to_end(normalized_query)
+        return embedding
+
+    response = await client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=normalized_query,
+        dimensions=EMBEDDING_DIMENSIONS,
+        encoding_format="base64"
+    )
+    embedding = np.frombuffer(base64.b64decode(response.data[0].embedding), dtype=np.float32)
+    _query_embeddings[normalized_query] = embedding
+    if len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+        _query_embeddings.popitem(last=False)
+    return embedding
+
+def init() -> None:
+    """Open the collection and build the FAISS index if configured; later calls are no-ops"""
+    global collection, faiss_index
+    if collection is not None:
+        return
+
+    # Imported here so importing core (e.g. in the uvicorn supervisor) does not open ChromaDB.
+    # The client (embedded or CHROMA_HOST server) is the one configured by read_messages; a
+    # collection from an older embedding schema fails startup instead of being dropped.
+    from read_messages import COLLECTION_NAME, open_collection
+    opened = open_collection(COLLECTION_NAME)
+    if VECTOR_BACKEND in ("faiss", "faiss-sq8"):
+        from faiss_backend import FaissBackend
+        faiss_index = FaissBackend.from_collection(opened, quantize=VECTOR_BACKEND == "faiss-sq8")
+    collection = opened
+
+async def count() -> int:
+    """Count the messages stored in the vector database"""
+    if collection is None:
+        await run_in_threadpool(init)
+    return await run_in_threadpool(collection.count)
+
+async def query(query_text: str, n_results: int = 5,
+                query_embedding: Optional[Sequence[float]] = None) -> List[MessageResponse]:
+    """Query similar messages from the vector database, reusing the caller's query embedding if given"""
+    if collection is None:
+        await run_in_threadpool(init)
+
+    # Get embedding for query text
+    if query_embedding is None:
+        query_embedding = await _embed_query(normalize_query(query_text))
+    else:
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+
+    cached_messages = query_cache.get(query_embedding, key=n_results)
+    if cached_messages is not None:
+        return cached_messages
+
+    # Query the index off the event loop
+    if faiss_index is not None:
+        results = await run_in_threadpool(faiss_index.query, query_embedding, n_results)
+    else:
+        results = await run_in_threadpool(
+            collection.query,
+            query_embeddings=query_embedding[None, :],
+            n_results=n_results,
+            include=['metadatas', 'distances', 'documents']  # Be explicit about what we want
+        )
+
+    # Add debug logging
+    logger.debug("ChromaDB Query Results: %s", results)
+
+    # Format results with safety checks
+    messages = []
+    documents = results.get('documents', [[]])[0]
+    distances = results.get('distances', [[]])[0]
+    metadatas = results.get('metadatas', [[]])[0]
+
+    # Ensure we have matching lengths
+    n = min(len(documents), len(distances), len(metadatas))
+
+    for i in range(n):
+        messages.append(MessageResponse(
+            message=documents[i],
+            similarity=1 - distances[i],  # Convert cosine distance to cosine similarity
+            metadata=metadatas[i] if metadatas[i] is not None else {}  # Handle None metadata
+        ))
+
+    query_cache.put(query_embedding, messages, key=n_results)
+    return messages
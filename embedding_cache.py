@@ -0,0 +1,49 @@
+import hashlib
+import sqlite3
+import numpy as np
+from typing import Dict, List
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store backed by SQLite.
+
+    Keys are a hash of the embedding namespace (model and dimensions) and the
+    text, so a text that has been embedded once is never sent to the API again,
+    whichever message or run it comes from. Vectors are stored as float32 bytes.
+    """
+
+    # Stay well under SQLite's limit on bound parameters per statement
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, path: str, namespace: str):
+        self.namespace = namespace.encode()
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb_cache (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+
+    def key(self, text: str) -> bytes:
+        """Hash a text together with the embedding namespace"""
+        return hashlib.blake2b(self.namespace + b"|" + text.encode(), digest_size=32).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the cached vectors for whichever of the keys are present"""
+        found = {}
+        for start in range(0, len(keys), self.LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + self.LOOKUP_CHUNK_SIZE]
+            rows = self.conn.execute(
+                f"SELECT hash, vec FROM emb_cache WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for key, vec in rows:
+                found[key] = np.frombuffer(vec, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Store vectors under their keys, keeping any existing entries"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO emb_cache (hash, vec) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in zip(keys, vectors)]
+            )
@@ -0,0 +1,15 @@
+# The OpenAI model used to embed documents and queries, truncated to EMBEDDING_DIMENSIONS.
+# Ingestion, the API server and the query client all embed with these, so they live
+# in this dependency-free module rather than in any one of them.
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 512
+
+# Minimum cosine similarity for a retrieved message to be used as context. Collections
+# use cosine distance, so a result's similarity (1 - distance) is its cosine similarity.
+# text-embedding-3-small scores related texts far lower than ada-002 did (typically
+# 0.3-0.6 rather than 0.8-0.9), so the old 0.6 cut-off would drop nearly every match.
+SIMILARITY_THRESHOLD = 0.4
+
+def normalize_query(query_text: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry"""
+    return " ".join(query_text.lower().split())
@@ -1,9 +1,18 @@
-import requests
+import aiohttp
+import base64
 import json
+import numpy as np
 from typing import List, Optional, Tuple
 from pydantic import BaseModel
 import argparse
-from openai import OpenAI
+import asyncio
+from openai import AsyncOpenAI
+from embedding_config import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, SIMILARITY_THRESHOLD, normalize_query
+
+# Shared clients so repeated queries reuse pooled connections, created on first use
+# inside the running event loop
+_session: Optional[aiohttp.ClientSession] = None
+_openai_client: Optional[AsyncOpenAI] = None
 
 class MessageResponse(BaseModel):
     message: str
@@ -17,17 +26,48 @@ def get_no_information_response() -> str:
             "1. File a new ticket to document this information, or\n"
             "2. Start a new Slack thread to discuss this topic.")
 
-def query_database(query_text: str, n_results: int = 10, similarity_threshold: float = 0.6, api_url: str = "http://localhost:8000") -> List[MessageResponse]:
-    """Query the vector database for similar messages with similarity threshold."""
-    try:
-        response = requests.post(
-            f"{api_url}/query",
-            json={"query_text": query_text, "n_results": n_results},
-            headers={"Content-Type": "application/json"}
+def _get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session to the API server."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=30)
         )
-        response.raise_for_status()
-        
-        results = response.json()
+    return _session
+
+def _get_openai_client() -> AsyncOpenAI:
+    """Return the shared OpenAI client."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI()
+    return _openai_client
+
+async def close() -> None:
+    """Close the shared HTTP session."""
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+async def get_query_embedding(query_text: str) -> np.ndarray:
+    """Embed a normalized query as a float32 vector."""
+    response = await _get_openai_client().embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=normalize_query(query_text),
+        dimensions=EMBEDDING_DIMENSIONS,
+        encoding_format="base64"
+    )
+    return np.frombuffer(base64.b64decode(response.data[0].embedding), dtype=np.float32)
+
+async def query_database(query_text: str, n_results: int = 10, similarity_threshold: float = SIMILARITY_THRESHOLD, api_url: str = "http://localhost:8000",
+                         query_embedding: Optional[np.ndarray] = None) -> List[MessageResponse]:
+    """Query the vector database for similar messages, reusing a precomputed query embedding if given."""
+    try:
+        payload = {"query_text": query_text, "n_results": n_results}
+        if query_embedding is not None:
+            payload["query_embedding"] = query_embedding.tolist()
+        async with _get_session().post(f"{api_url}/query", json=payload) as response:
+            response.raise_for_status()
+            results = await response.json()
         
         # Filter results by similarity threshold
         filtered_results = [
@@ -41,14 +81,25 @@ def query_database(query_text: str, n_results: int = 10, similarity_threshold: f
         print(f"Error querying database: {str(e)}")
         return []
 
-def get_llm_response(query: str, context_messages: List[MessageResponse]) -> Tuple[str, List[str]]:
+async def query_local(query_text: str, n_results: int = 10, similarity_threshold: float = SIMILARITY_THRESHOLD,
+                      query_embedding: Optional[np.ndarray] = None) -> List[MessageResponse]:
+    """Query the vector database in-process, without going through the API server."""
+    # Imported lazily so the HTTP path does not need ChromaDB loaded
+    import core
+
+    results = await core.query(query_text, n_results, query_embedding)
+    return [
+        MessageResponse(**result.model_dump())
+        for result in results
+        if result.similarity >= similarity_threshold
+    ]
+
+async def get_llm_response(query: str, context_messages: List[MessageResponse]) -> Tuple[str, List[str]]:
     """Get LLM response based on query and context."""
     # If no messages above threshold, return standard response
     if not context_messages:
         return get_no_information_response(), []
 
-    client = OpenAI()
-    
     # Prepare context from retrieved messages
     context = "\n\n".join([
         f"Document {i+1}:\n{msg.message}" 
@@ -70,7 +121,7 @@ def get_llm_response(query: str, context_messages: List[MessageResponse]) -> Tup
     user_prompt = f"Query: {query}\n\nContext:\n{context}"
     
     # Get completion from OpenAI
-    response = client.chat.completions.create(
+    response = await _get_openai_client().chat.completions.create(
         model="gpt-4",  # or your preferred model
         messages=[
             {"role": "system", "content": system_message},
@@ -80,6 +131,20 @@ def get_llm_response(query: str, context_messages: List[MessageResponse]) -> Tup
     
     return response.choices[0].message.content, urls
 
+async def answer(query: str, n_results: int, similarity_threshold: float, local: bool) -> Tuple[str, List[str]]:
+    """Retrieve context for a query and get the LLM response for it."""
+    try:
+        # Query the database
+        if local:
+            results = await query_local(query, n_results, similarity_threshold)
+        else:
+            results = await query_database(query, n_results, similarity_threshold)
+
+        # Get LLM response
+        return await get_llm_response(query, results)
+    finally:
+        await close()
+
 def main():
     parser = argparse.ArgumentParser(description="Query the vector database and get LLM response")
     parser.add_argument("--query", "-q", 
@@ -92,20 +157,19 @@ def main():
                        help="Number of results to return (default: 10)")
     parser.add_argument("--threshold", 
                        type=float, 
-                       default=0.6,
-                       help="Similarity threshold (default: 0.6)")
+                       default=SIMILARITY_THRESHOLD,
+                       help=f"Cosine similarity threshold (default: {SIMILARITY_THRESHOLD})")
+    parser.add_argument("--local",
+                       action="store_true",
+                       help="Query the vector database in-process instead of through the API server")
     args = parser.parse_args()
 
     # If no query provided, prompt the user
     if args.query is None:
         args.query = input("Enter your search query: ")
 
-    # Query the database
-    results = query_database(args.query, args.num_results, args.threshold)
-    
-    # Get LLM response
-    llm_response, urls = get_llm_response(args.query, results)
-    
+    llm_response, urls = asyncio.run(answer(args.query, args.num_results, args.threshold, args.local))
+
     # Print results
     print("\nAI Response:")
     print("-" * 80)
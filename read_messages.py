@@ -1,38 +1,136 @@
 from abc import ABC, abstractmethod
+import argparse
+import asyncio
+import base64
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
 import openai
+import orjson
 import chromadb
 from chromadb.config import Settings
 import logging
+import numpy as np
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+from slack_sdk.web.async_client import AsyncWebClient
 import os
-from typing import List, Dict, Any, Optional
+import tiktoken
+from embedding_cache import EmbeddingCache
+from embedding_config import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
 
 # Initialize OpenAI
 openai.api_key = os.environ.get("OPENAI_API_KEY")
 if not openai.api_key:
     raise ValueError("OPENAI_API_KEY environment variable not found")
 
-# Initialize ChromaDB
-chroma_client = chromadb.PersistentClient(path="chroma_db")
+# Initialize ChromaDB: embedded by default, or a Chroma server (`chroma run --path chroma_db`)
+# when CHROMA_HOST is set, which keeps index maintenance out of this process
+if os.getenv("CHROMA_HOST"):
+    chroma_client = chromadb.HttpClient(host=os.environ["CHROMA_HOST"], port=int(os.getenv("CHROMA_PORT", "8001")))
+else:
+    chroma_client = chromadb.PersistentClient(path="chroma_db")
+
+# Initialize Slack, sharing one client (and its connection pool) across data sources.
+# Rate-limited calls are retried after the Retry-After delay Slack asks for.
+SLACK_RATE_LIMIT_RETRIES = 5
+slack_client = WebClient(token=os.environ.get('SLACK_BOT_TOKEN'))
+slack_client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES))
 
 # The name of the collection/database names to use for the data source
 COLLECTION_NAME = "slack"
 
+# Where fetched Slack messages are saved for persistence and replay (JSON lines)
+SLACK_MESSAGES_FILE = "slack_messages.jsonl"
+
+# Local cache of Slack channel name -> channel id, refreshed only on a miss
+SLACK_CHANNEL_ID_CACHE = ".slack_channel_ids.json"
+
+# Messages requested per conversations_history page (Slack allows up to 999)
+SLACK_HISTORY_PAGE_SIZE = 999
+
+# Maximum number of Slack thread reply fetches in flight (Tier 3 rate limits)
+SLACK_REPLIES_CONCURRENCY = 8
+
+# Permalink API calls in flight when permalinks cannot be built locally
+SLACK_PERMALINK_CONCURRENCY = 8
+
+# Messages written per Chroma upsert; larger batches amortize the per-write cost
+# but must stay under Chroma's maximum batch size
+CHROMA_UPSERT_BATCH_SIZE = 250
+
+# Messages taken from the stream per processing batch. Kept small (one upsert's worth)
+# so embedding starts as soon as the first history page arrives and later pages are
+# fetched while earlier batches are embedded and stored. Independent of how texts are
+# packed into embedding requests (see get_embeddings_batch).
+PROCESS_BATCH_SIZE = CHROMA_UPSERT_BATCH_SIZE
+
+# SQLite file caching embeddings by content, so unchanged texts are never re-embedded
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite3"
+
+# Maximum number of embedding requests in flight, and retries (with exponential
+# backoff honouring Retry-After) for rate-limited or failed requests
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "20"))
+OPENAI_MAX_RETRIES = 5
+
+# Bump whenever stored embeddings become incompatible (model, dimension or distance change)
+EMBEDDING_SCHEMA_VERSION = 3
+
+# Cosine distance so similarities read as cosine similarity, and HNSW build parameters
+# bounding graph construction cost on ingest
+HNSW_SETTINGS = {"hnsw:space": "cosine", "hnsw:construction_ef": 100, "hnsw:M": 16}
+
+def open_collection(collection_name: str, recreate_stale: bool = False):
+    """
+    Open a collection, creating it with the current embedding schema if it does not exist
+    Args:
+        collection_name: Name of the collection
+        recreate_stale: Drop and recreate a collection holding embeddings from another
+            schema. Only ingestion does this; the API server must never delete data.
+    Raises:
+        ValueError: The collection holds embeddings from another schema and recreate_stale is False
+    """
+    collection = chroma_client.get_or_create_collection(
+        name=collection_name,
+        metadata={"schema_version": EMBEDDING_SCHEMA_VERSION, **HNSW_SETTINGS}
+    )
+    if (collection.metadata or {}).get("schema_version") == EMBEDDING_SCHEMA_VERSION:
+        return collection
+
+    if not recreate_stale:
+        raise ValueError(f"Collection {collection_name} holds embeddings from an older schema; "
+                         f"re-run read_messages.py to rebuild it")
+
+    logger.warning(f"Recreating collection {collection_name} for embedding schema "
+                   f"version {EMBEDDING_SCHEMA_VERSION}; all messages will be re-embedded")
+    chroma_client.delete_collection(name=collection_name)
+    return chroma_client.create_collection(
+        name=collection_name,
+        metadata={"schema_version": EMBEDDING_SCHEMA_VERSION, **HNSW_SETTINGS}
+    )
+
 class DataSource(ABC):
     """Abstract base class for different data sources"""
     
     def __init__(self, collection_name: str):
         self.collection_name = collection_name
-        self.collection = chroma_client.get_or_create_collection(name=collection_name)
+        self.collection = open_collection(collection_name, recreate_stale=True)
+        self.embedding_cache = EmbeddingCache(
+            EMBEDDING_CACHE_PATH,
+            namespace=f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}"
+        )
 
     @abstractmethod
-    def fetch_messages(self) -> List[Dict[str, Any]]:
+    def fetch_messages(self) -> Iterator[Dict[str, Any]]:
         """
         Fetch messages from the data source
         Returns:
-            List[Dict[str, Any]]: List of messages in dictionary format
+            Iterator[Dict[str, Any]]: Messages in dictionary format, streamed as they are fetched
         """
         pass
 
@@ -47,11 +145,11 @@ class DataSource(ABC):
         pass
 
     @abstractmethod
-    def process_messages(self, messages: List[Dict[str, Any]]) -> bool:
+    def process_messages(self, messages: Iterable[Dict[str, Any]]) -> bool:
         """
         Process messages and store embeddings in ChromaDB
         Args:
-            messages: List of messages to process
+            messages: Messages to process, either a list or a stream
         Returns:
             bool: True if processing successful, False otherwise
         """
@@ -63,85 +161,266 @@ class DataSource(ABC):
         """Save formatted messages according to the source's specific needs"""
         pass
 
-    def get_embedding(self, text: str) -> List[float]:
-        """Get OpenAI embedding for a given text"""
+    def get_embedding(self, text: str) -> np.ndarray:
+        """Get OpenAI embedding for a given text as a float32 vector"""
         client = openai.OpenAI()
         response = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
+            model=EMBEDDING_MODEL,
+            input=text,
+            dimensions=EMBEDDING_DIMENSIONS
         )
-        return response.data[0].embedding
-
-    def update_collection(self, message_id: str, formatted_message: str, 
-                         embedding: List[float], metadata: Dict[str, Any], 
-                         existing_ids: set) -> None:
-        """Update or add message to ChromaDB collection"""
-        if message_id in existing_ids:
-            print(f"Updating message {message_id}")
-            self.collection.update(
-                documents=[formatted_message],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                ids=[message_id]
-            )
-        else:
-            print(f"Adding new message {message_id}")
-            self.collection.add(
-                documents=[formatted_message],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                ids=[message_id]
+        return np.asarray(response.data[0].embedding, dtype=np.float32)
+
+    def get_embeddings_batch(self, texts: List[str], max_tokens_per_batch: int = 250000,
+                             max_items: int = 1024) -> np.ndarray:
+        """
+        Get OpenAI embeddings for many texts in as few API calls as possible, issued concurrently
+        Args:
+            texts: Texts to embed
+            max_tokens_per_batch: Token budget for a single embeddings request (OpenAI allows 300k)
+            max_items: Maximum number of inputs in a single embeddings request (OpenAI allows 2048)
+        Returns:
+            np.ndarray: float32 array with one embedding row per text, in the same order as texts
+        """
+        embeddings = np.empty((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+
+        # Serve previously embedded texts from the cache and only send misses to OpenAI
+        keys = [self.embedding_cache.key(text) for text in texts]
+        cached = self.embedding_cache.get_many(keys)
+        misses = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+            else:
+                misses.append(i)
+        if cached:
+            logger.info(f"Reused {len(texts) - len(misses)} of {len(texts)} embeddings from the cache")
+        if not misses:
+            return embeddings
+
+        fresh = np.empty((len(misses), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        batches = list(self._iter_embedding_batches([texts[i] for i in misses], max_tokens_per_batch, max_items))
+        asyncio.run(self._embed_batches(batches, fresh))
+        embeddings[misses] = fresh
+        self.embedding_cache.put_many([keys[i] for i in misses], fresh)
+        return embeddings
+
+    async def _embed_batches(self, batches: List[List[str]], embeddings: np.ndarray) -> None:
+        """Embed batches concurrently, writing each result into its rows of embeddings"""
+        semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+        async def embed(client: openai.AsyncOpenAI, batch: List[str], offset: int) -> None:
+            async with semaphore:
+                # base64 lets us decode straight into float32 instead of building Python floats
+                response = await client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=batch,
+                    dimensions=EMBEDDING_DIMENSIONS,
+                    encoding_format="base64"
+                )
+            for d in response.data:
+                embeddings[offset + d.index] = np.frombuffer(base64.b64decode(d.embedding), dtype=np.float32)
+
+        offsets = np.cumsum([0] + [len(batch) for batch in batches[:-1]])
+        async with openai.AsyncOpenAI(max_retries=OPENAI_MAX_RETRIES) as client:
+            await asyncio.gather(*[
+                embed(client, batch, int(offset)) for batch, offset in zip(batches, offsets)
+            ])
+
+    def _iter_embedding_batches(self, texts: List[str], max_tokens_per_batch: int,
+                                max_items: int) -> Iterator[List[str]]:
+        """Greedily pack texts into batches that stay under the token and item limits"""
+        encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            n_tokens = len(encoding.encode(text))
+            if batch and (batch_tokens + n_tokens > max_tokens_per_batch or len(batch) >= max_items):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += n_tokens
+        if batch:
+            yield batch
+
+    def get_existing_hashes(self, page_size: int = 10000) -> Dict[str, Optional[str]]:
+        """Map every stored message id to its content hash, paging through the collection"""
+        existing_hashes = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=['metadatas'], limit=page_size, offset=offset)
+            for message_id, metadata in zip(page['ids'], page['metadatas']):
+                existing_hashes[message_id] = (metadata or {}).get("content_sha")
+            if len(page['ids']) < page_size:
+                return existing_hashes
+            offset += page_size
+
+    def upsert_collection(self, message_ids: List[str], formatted_messages: List[str],
+                          embeddings: np.ndarray, metadatas: List[Dict[str, Any]]) -> None:
+        """Insert or update a batch of messages in the ChromaDB collection in a few large writes"""
+        for start in range(0, len(message_ids), CHROMA_UPSERT_BATCH_SIZE):
+            end = start + CHROMA_UPSERT_BATCH_SIZE
+            self.collection.upsert(
+                documents=formatted_messages[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=message_ids[start:end]
             )
+        if message_ids:
+            logger.info(f"Upserted {len(message_ids)} messages into {self.collection_name}")
 
 class SlackDataSource(DataSource):
     """Slack-specific implementation of DataSource"""
     
-    def __init__(self, channel_name: str):
+    def __init__(self, channel_name: str, use_permalink_api: bool = False):
         super().__init__("slack")
-        self.slack_client = WebClient(token=os.environ.get('SLACK_BOT_TOKEN'))
+        self.slack_client = slack_client
         self.channel_name = channel_name
         self.channel_id = self._get_channel_id()
+        # Permalinks are built from the workspace URL unless the API is requested
+        self._workspace_url = None if use_permalink_api else self._get_workspace_url()
 
     def _get_channel_id(self) -> str:
-        channels = self.slack_client.conversations_list(types="public_channel")
-        target_channel = next(channel for channel in channels["channels"] 
-                            if channel["name"] == self.channel_name)
-        return target_channel["id"]
+        """Resolve the channel name to its id, listing channels only on a cache miss"""
+        channel_ids = {}
+        if os.path.exists(SLACK_CHANNEL_ID_CACHE):
+            with open(SLACK_CHANNEL_ID_CACHE) as f:
+                channel_ids = json.load(f)
+
+        if self.channel_name not in channel_ids:
+            cursor = None
+            while True:
+                response = self.slack_client.conversations_list(
+                    types="public_channel",
+                    cursor=cursor,
+                    limit=1000
+                )
+                for channel in response["channels"]:
+                    channel_ids[channel["name"]] = channel["id"]
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                # Stop paging as soon as the channel has been seen
+                if not cursor or self.channel_name in channel_ids:
+                    break
+
+            with open(SLACK_CHANNEL_ID_CACHE, "w") as f:
+                json.dump(channel_ids, f)
 
-    def fetch_messages(self) -> List[Dict[str, Any]]:
-        """Fetch messages from Slack and return them while also saving to file"""
+        if self.channel_name not in channel_ids:
+            raise ValueError(f"Slack channel #{self.channel_name} not found")
+        return channel_ids[self.channel_name]
+
+    def fetch_messages(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the full channel history page by page, saving each message to file as it is yielded.
+        The file only replaces the previous one once the whole history has been fetched, so a failed
+        or abandoned run leaves the last complete copy in place for --from-file.
+        """
+        # Still save to file for persistence, one JSON message per line
+        partial_file = f"{SLACK_MESSAGES_FILE}.partial"
         try:
-            messages = self.slack_client.conversations_history(channel=self.channel_id)["messages"]
-            result = []
+            with open(partial_file, "wb") as f:
+                for page in self._iter_history_pages():
+                    for message_data in page:
+                        f.write(orjson.dumps(message_data, option=orjson.OPT_APPEND_NEWLINE))
+                        yield message_data
+            os.replace(partial_file, SLACK_MESSAGES_FILE)
+        except SlackApiError as e:
+            logger.error(f"Error fetching Slack messages: {e.response['error']}")
+            raise
+        finally:
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+
+    def _iter_history_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield history pages, fetching the next page in the background while the current one is processed"""
+        def fetch_page(cursor: Optional[str]):
+            response = self.slack_client.conversations_history(
+                channel=self.channel_id,
+                cursor=cursor,
+                limit=SLACK_HISTORY_PAGE_SIZE
+            )
+            next_cursor = response.get("response_metadata", {}).get("next_cursor")
+            return self._build_message_data(response["messages"]), next_cursor
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch_page, None)
+            while future is not None:
+                page, cursor = future.result()
+                future = executor.submit(fetch_page, cursor) if cursor else None
+                yield page
+
+    def _build_message_data(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convert one page of Slack history into message dicts with their thread replies"""
+        thread_replies = asyncio.run(self._fetch_thread_replies(
+            [message["thread_ts"] for message in messages if "thread_ts" in message]
+        ))
+        result = []
+        
+        for message in messages:
+            message_data = {
+                "id": message.get("ts"),
+                "user": message.get("user"),
+                "text": message.get("text"),
+                "thread_replies": []
+            }
             
-            for message in messages:
-                message_data = {
-                    "id": message.get("ts"),
-                    "user": message.get("user"),
-                    "text": message.get("text"),
-                    "thread_replies": []
-                }
+            if "thread_ts" in message:
+                message_data["thread_replies"] = thread_replies.get(message["thread_ts"], [])
                 
-                if "thread_ts" in message:
-                    thread_replies = self.slack_client.conversations_replies(
-                        channel=self.channel_id,
-                        ts=message["thread_ts"]
-                    )["messages"]
-                    message_data["thread_replies"] = thread_replies[1:]
-                    
-                result.append(message_data)
-
-            # Still save to file for persistence
-            with open("slack_messages.json", "w") as f:
-                json.dump(result, f, indent=2)
-                
-            return result
+            result.append(message_data)
+        return result
+
+    async def _fetch_thread_replies(self, thread_ts_list: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch the replies of many threads concurrently, keyed by thread timestamp"""
+        async_client = AsyncWebClient(token=os.environ.get('SLACK_BOT_TOKEN'))
+        async_client.retry_handlers.append(
+            AsyncRateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES)
+        )
+        semaphore = asyncio.Semaphore(SLACK_REPLIES_CONCURRENCY)
+
+        async def fetch(thread_ts: str):
+            async with semaphore:
+                response = await async_client.conversations_replies(
+                    channel=self.channel_id,
+                    ts=thread_ts
+                )
+            return thread_ts, response["messages"][1:]
+
+        replies = {}
+        # as_completed so that one failed thread does not cancel its peers
+        for future in asyncio.as_completed([fetch(ts) for ts in thread_ts_list]):
+            try:
+                thread_ts, thread_replies = await future
+            except SlackApiError as e:
+                logger.error(f"Error fetching thread replies: {e.response['error']}")
+                continue
+            replies[thread_ts] = thread_replies
+        return replies
 
+    def _get_workspace_url(self) -> Optional[str]:
+        """Get the workspace URL (e.g. https://acme.slack.com/) with a single auth.test call"""
+        try:
+            return self.slack_client.auth_test()["url"]
         except SlackApiError as e:
-            print(f"Error fetching Slack messages: {e.response['error']}")
-            return []
+            logger.error(f"Error getting workspace URL, falling back to permalink API: {e.response['error']}")
+            return None
 
     def get_message_permalink(self, message_id: str) -> Optional[str]:
+        """Build the permalink locally; Slack permalinks are the workspace URL, channel and ts"""
+        if self._workspace_url:
+            return f"{self._workspace_url.rstrip('/')}/archives/{self.channel_id}/p{message_id.replace('.', '')}"
+        return self._fetch_permalink(message_id)
+
+    def get_message_permalinks(self, message_ids: List[str]) -> List[Optional[str]]:
+        """Get permalinks for many messages, fetching them concurrently if they cannot be built locally"""
+        if self._workspace_url:
+            return [self.get_message_permalink(message_id) for message_id in message_ids]
+        with ThreadPoolExecutor(max_workers=SLACK_PERMALINK_CONCURRENCY) as executor:
+            return list(executor.map(self._fetch_permalink, message_ids))
+
+    def _fetch_permalink(self, message_id: str) -> Optional[str]:
+        """Get the permalink for a message from the chat.getPermalink API"""
         try:
             response = self.slack_client.chat_getPermalink(
                 channel=self.channel_id,
@@ -149,63 +428,114 @@ class SlackDataSource(DataSource):
             )
             return response["permalink"] if response["ok"] else None
         except SlackApiError as e:
-            print(f"Error getting permalink: {e.response['error']}")
+            logger.error(f"Error getting permalink: {e.response['error']}")
             return None
 
     def format_message(self, message: Dict[str, Any]) -> str:
-        formatted = f"|<message_start>| {message['text']} |<message_end>|"
-        
-        if message['thread_replies']:
-            for reply in message['thread_replies']:
-                formatted += f" |<thread_start>| {reply['text']} |<thread_end>|"
-        
-        return formatted
+        parts = [f"|<message_start>| {message['text']} |<message_end>|"]
+        parts.extend(
+            f" |<thread_start>| {reply['text']} |<thread_end>|"
+            for reply in message['thread_replies']
+        )
+        return "".join(parts)
 
-    def process_messages(self, messages: List[Dict[str, Any]]) -> bool:
-        """Slack-specific message processing implementation"""
+    def get_source_messages(self) -> Iterator[Dict[str, Any]]:
+        """Stream previously fetched messages from disk one at a time"""
+        with open(SLACK_MESSAGES_FILE, "rb") as f:
+            for line in f:
+                yield orjson.loads(line)
+
+    def process_messages(self, messages: Iterable[Dict[str, Any]], batch_size: int = PROCESS_BATCH_SIZE) -> bool:
+        """Slack-specific message processing implementation, embedding and storing batch by batch"""
         try:
-            existing_ids = set(self.collection.get()['ids'])
-            formatted_messages = []
-            message_permalinks = []
-
-            for message in messages:
-                message_id = str(message['id'])
-                message_permalink = self.get_message_permalink(message_id)
-                formatted_message = self.format_message(message)
-                
-                if message_id in existing_ids:
-                    existing_result = self.collection.get(ids=[message_id])
-                    if existing_result['documents'] and existing_result['documents'][0] == formatted_message:
-                        print(f"Skipping unchanged message {message_id}")
-                        continue
-                
-                formatted_messages.append(formatted_message)
-                message_permalinks.append(message_permalink if message_permalink else "No permalink available")
-                
-                embedding = self.get_embedding(formatted_message)
-                metadata = {"url": message_permalink, "type": "slack"} if message_permalink else {}
-                
-                self.update_collection(message_id, formatted_message, embedding, metadata, existing_ids)
-            
-            self.save_formatted_messages(formatted_messages, message_permalinks)
+            existing_hashes = self.get_existing_hashes()
+            batch = []
+            writes = []
+
+            # Chroma writes run on a background writer so each upsert overlaps the next batch's embedding
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                for message in messages:
+                    batch.append(message)
+                    if len(batch) >= batch_size:
+                        writes.append(self._process_batch(batch, existing_hashes, writer))
+                        batch = []
+                        # Keep at most one batch queued behind the writer and surface its errors
+                        if len(writes) > 1:
+                            writes.pop(0).result()
+
+                if batch:
+                    writes.append(self._process_batch(batch, existing_hashes, writer))
+                for write in writes:
+                    write.result()
+
+            logger.info(f"Collection {self.collection_name} now holds {len(existing_hashes)} messages")
             return True
 
         except Exception as e:
-            print(f"Error processing messages: {str(e)}")
+            logger.error(f"Error processing messages: {str(e)}")
             return False
 
+    def _process_batch(self, messages: List[Dict[str, Any]], existing_hashes: Dict[str, Optional[str]],
+                       writer: ThreadPoolExecutor) -> Future:
+        """Embed the new or changed messages of one batch and queue them for storage on the writer"""
+        pending = []
+
+        for message in messages:
+            message_id = str(message['id'])
+            # File-only or attachment-only messages have no text worth embedding
+            if not message.get('text') and not message.get('thread_replies'):
+                logger.debug(f"Skipping empty message {message_id}")
+                continue
+
+            formatted_message = self.format_message(message)
+            content_sha = hashlib.sha256(formatted_message.encode()).hexdigest()
+            
+            if existing_hashes.get(message_id) == content_sha:
+                logger.debug(f"Skipping unchanged message {message_id}")
+                continue
+            
+            # Track it in the snapshot so a repeat later in the stream is skipped without a lookup
+            existing_hashes[message_id] = content_sha
+            pending.append((message_id, formatted_message, content_sha))
+
+        # Only the new or changed messages need permalinks
+        permalinks = self.get_message_permalinks([mid for mid, _, _ in pending])
+
+        # Embed each distinct text once; repeated messages (bot pings, "+1") share a vector
+        unique_messages = list(dict.fromkeys(fm for _, fm, _ in pending))
+        index_by_text = {text: i for i, text in enumerate(unique_messages)}
+        embeddings = self.get_embeddings_batch(unique_messages)[[index_by_text[fm] for _, fm, _ in pending]]
+        if len(unique_messages) < len(pending):
+            logger.info(f"Embedded {len(unique_messages)} distinct texts for {len(pending)} messages")
+
+        message_ids = [mid for mid, _, _ in pending]
+        formatted_messages = [fm for _, fm, _ in pending]
+        message_permalinks = [p if p else "No permalink available" for p in permalinks]
+        metadatas = [
+            {"url": p, "type": "slack", "content_sha": h} if p else {"content_sha": h}
+            for (_, _, h), p in zip(pending, permalinks)
+        ]
+
+        write = writer.submit(self.upsert_collection, message_ids, formatted_messages, embeddings, metadatas)
+        
+        self.save_formatted_messages(formatted_messages, message_permalinks)
+        return write
+
     def save_formatted_messages(self, formatted_messages: List[str], 
                               message_permalinks: List[str]) -> None:
         """Slack-specific implementation for saving formatted messages"""
         if not formatted_messages:
-            print("No new messages to add")
+            logger.info("No new messages to add")
             return
 
         filename = f"formatted_{self.collection_name}_messages.txt"
-        with open(filename, "a") as f:
-            for message, permalink in zip(formatted_messages, message_permalinks):
-                f.write(f"{message}\nURI: {permalink}\n\n")
-        print(f"Added {len(formatted_messages)} new messages to {filename}")
+        payload = "".join(
+            f"{message}\nURI: {permalink}\n\n"
+            for message, permalink in zip(formatted_messages, message_permalinks)
+        )
+        with open(filename, "a", buffering=1 << 20) as f:
+            f.write(payload)
+        logger.info(f"Added {len(formatted_messages)} new messages to {filename}")
 
 class JiraDataSource(DataSource):
     def __init__(self, project_key: str):
@@ -215,7 +545,7 @@ class JiraDataSource(DataSource):
 
     # ... other required methods ...
 
-    def process_messages(self, messages: List[Dict[str, Any]]) -> bool:
+    def process_messages(self, messages: Iterable[Dict[str, Any]]) -> bool:
         """Jira-specific message processing implementation"""
         try:
             # Implement Jira-specific processing logic
@@ -223,7 +553,7 @@ class JiraDataSource(DataSource):
             # (issues, comments, attachments) differently
             pass
         except Exception as e:
-            print(f"Error processing Jira messages: {str(e)}")
+            logger.error(f"Error processing Jira messages: {str(e)}")
             return False
 
     def save_formatted_messages(self, formatted_messages: List[str], 
@@ -235,25 +565,35 @@ class JiraDataSource(DataSource):
 
 def main():
     """Main function to run the entire workflow"""
-    print("Starting message processing workflow...")
+    parser = argparse.ArgumentParser(description="Fetch Slack messages and store their embeddings")
+    parser.add_argument("--from-file",
+                       action="store_true",
+                       help=f"Reprocess messages saved in {SLACK_MESSAGES_FILE} instead of fetching from Slack")
+    parser.add_argument("--permalink-api",
+                       action="store_true",
+                       help="Get permalinks from chat.getPermalink instead of building them from the workspace URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    logger.info("Starting message processing workflow...")
     
     # Initialize Slack data source
-    slack_source = SlackDataSource(channel_name="general")
-    
-    # Step 1: Fetch messages
-    print("\n1. Fetching messages...")
-    messages = slack_source.fetch_messages()
-    if not messages:
-        print("Failed to fetch messages. Aborting.")
-        return
+    slack_source = SlackDataSource(channel_name="general", use_permalink_api=args.permalink_api)
     
-    # Step 2: Process messages and create embeddings
-    print("\n2. Processing messages and creating embeddings...")
+    # Messages stream straight from the source into processing; a fetch error
+    # surfaces as a processing failure
+    if args.from_file:
+        logger.info(f"Streaming messages from {SLACK_MESSAGES_FILE} and creating embeddings...")
+        messages = slack_source.get_source_messages()
+    else:
+        logger.info("Fetching messages and creating embeddings...")
+        messages = slack_source.fetch_messages()
+
     if not slack_source.process_messages(messages):
-        print("Failed to process messages. Aborting.")
+        logger.error("Failed to process messages. Aborting.")
         return
     
-    print("\nWorkflow completed successfully!")
+    logger.info("Workflow completed successfully!")
 
 if __name__ == "__main__":
     main()
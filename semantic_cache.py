@@ -0,0 +1,69 @@
+import time
+import numpy as np
+from typing import Any, Hashable, List, Optional, Sequence
+
+
+class SemanticCache:
+    """
+    Small in-memory cache keyed by embedding vectors.
+
+    A lookup hits when a stored embedding has cosine similarity above the
+    threshold with the query embedding, so near-duplicate queries (different
+    casing, punctuation or phrasing) share a cached value. Entries live in a
+    fixed-size ring buffer so the oldest ones are evicted first.
+    """
+
+    def __init__(self, capacity: int = 1000, threshold: float = 0.97,
+                 ttl_seconds: Optional[float] = None):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._values: List[Any] = [None] * capacity
+        self._timestamps = np.zeros(capacity)
+        self._size = 0
+        self._next = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding: Sequence[float], key: Hashable = None) -> Optional[Any]:
+        """
+        Return the cached value for the most similar stored embedding
+        Args:
+            embedding: Query embedding
+            key: Extra exact-match key (e.g. the requested number of results)
+        Returns:
+            The cached value, or None on a miss
+        """
+        if self._size == 0:
+            return None
+
+        similarities = self._matrix[:self._size] @ self._normalize(embedding)
+        if self.ttl_seconds is not None:
+            expired = self._timestamps[:self._size] < time.time() - self.ttl_seconds
+            similarities[expired] = -1.0
+
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < self.threshold:
+                return None
+            if self._keys[index] == key:
+                return self._values[index]
+        return None
+
+    def put(self, embedding: Sequence[float], value: Any, key: Hashable = None) -> None:
+        """Store a value under the given embedding, evicting the oldest entry when full"""
+        vector = self._normalize(embedding)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+        self._matrix[self._next] = vector
+        self._keys[self._next] = key
+        self._values[self._next] = value
+        self._timestamps[self._next] = time.time()
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
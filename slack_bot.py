@@ -1,9 +1,12 @@
+import asyncio
 import os
 import re
 import logging
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
-from query_api import query_database, get_llm_response
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
+from query_api import query_database, get_llm_response, get_query_embedding
+from embedding_config import SIMILARITY_THRESHOLD
+from semantic_cache import SemanticCache
 from dotenv import load_dotenv
 
 # Set up logging
@@ -14,9 +17,12 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # get the threshold and n_results 
-THRESHOLD = 0.6
+THRESHOLD = SIMILARITY_THRESHOLD
 N_RESULTS = 10
 
+# Answers (LLM response and source URLs) to recent questions; a near-identical
+# mention is answered from here without querying the database or the LLM
+response_cache = SemanticCache(capacity=1000, threshold=0.97, ttl_seconds=3600)
 
 # Get tokens with error checking
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
@@ -28,11 +34,12 @@ if not SLACK_BOT_TOKEN or not SLACK_APP_TOKEN:
         "are set in your .env file"
     )
 
-# Initialize Slack app with your bot token
-app = App(token=SLACK_BOT_TOKEN)
+# Initialize Slack app with your bot token. Handlers are async so the bot keeps
+# serving other mentions while one waits on the database or the LLM.
+app = AsyncApp(token=SLACK_BOT_TOKEN)
 
 @app.event("app_mention")
-def handle_mention(event, say):
+async def handle_mention(event, say):
     """Handle when the bot is mentioned in a channel."""
     try:
         # Get the message text and remove the bot mention
@@ -45,43 +52,55 @@ def handle_mention(event, say):
         bot_mention_pattern = re.compile(r'<@[A-Z0-9]+>')
         message_text = re.sub(bot_mention_pattern, '', text).strip()
 
-        # Query the database
-        results = query_database(message_text, n_results=N_RESULTS, similarity_threshold=THRESHOLD)
-        
-        # Get LLM response
-        llm_response, urls = get_llm_response(message_text, results)
+        # Embed the question once for both the cache and the database query
+        query_embedding = await get_query_embedding(message_text)
+        cached_answer = response_cache.get(query_embedding)
+        if cached_answer is not None:
+            logger.info("Answering mention from the response cache")
+            llm_response, urls = cached_answer
+        else:
+            # Query the database
+            results = await query_database(message_text, n_results=N_RESULTS, similarity_threshold=THRESHOLD,
+                                           query_embedding=query_embedding)
+
+            # Get LLM response
+            llm_response, urls = await get_llm_response(message_text, results)
+            # query_database returns no results when the API server fails, so only
+            # answers grounded in retrieved messages are cached
+            if results:
+                response_cache.put(query_embedding, (llm_response, urls))
         
         # Format the main response
         response_text = llm_response
         
         # Send the main response in thread
-        say(text=response_text, thread_ts=thread_ts)
+        await say(text=response_text, thread_ts=thread_ts)
         
         # If there are URLs, send them as a separate message in the same thread
         if urls:
             url_text = "*Relevant Sources:*\n" + "\n".join([f"• {url}" for url in urls])
-            say(text=url_text, thread_ts=thread_ts)
+            await say(text=url_text, thread_ts=thread_ts)
         
     except Exception as e:
         logger.error(f"Error: {str(e)}")
-        say(
+        await say(
             text="Sorry, I encountered an error while processing your request.",
             thread_ts=thread_ts
         )
 
-def main():
+async def main():
     try:
         logger.info("Starting Slack bot...")
         logger.debug(f"Using Socket Mode with App Token: {SLACK_APP_TOKEN[:10]}...")
         
         # Start the app using Socket Mode
-        handler = SocketModeHandler(app, SLACK_APP_TOKEN)
+        handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
         logger.info("Handler created, starting...")
-        handler.start()
+        await handler.start_async()
         
     except Exception as e:
         logger.error(f"Failed to start the bot: {str(e)}", exc_info=True)
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file